@@ -0,0 +1,186 @@
+"""Per-device circuit breaker with adaptive timeouts"""
+
+import logging
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is refused because the device circuit is open"""
+
+
+class CircuitBreaker:
+    """Circuit breaker and adaptive timeout for a single device.
+
+    The timeout is derived from the RTTs observed on successful requests: the
+    given percentile, times a safety factor, clamped to [min_timeout, max_timeout].
+    After failure_threshold consecutive failures the circuit opens and requests
+    fail fast, while a background thread probes the device with a TCP connect
+    every probe_interval seconds. When a probe succeeds the circuit goes half-open
+    and lets a single trial request through, which closes or re-opens it.
+    """
+
+    def __init__(
+        self,
+        ip: str,
+        port: int,
+        default_timeout: float,
+        min_timeout: float = 0.5,
+        max_timeout: float = 10.0,
+        failure_threshold: int = 2,
+        probe_interval: float = 30.0,
+        percentile: float = 0.95,
+        factor: float = 3.0,
+        window: int = 50,
+    ) -> None:
+        """Initialize a new instance of the class
+
+        Args:
+            ip (str): IP address of the device.
+            port (int): TCP port used to probe the device while the circuit is open.
+            default_timeout (float): timeout used until an RTT has been observed.
+            min_timeout (float, optional): lower bound of the adaptive timeout. Defaults to 0.5.
+            max_timeout (float, optional): upper bound of the adaptive timeout. Defaults to 10.0.
+            failure_threshold (int, optional): consecutive failures that open the circuit. Defaults to 2.
+            probe_interval (float, optional): seconds between background probes. Defaults to 30.0.
+            percentile (float, optional): RTT percentile the timeout is based on. Defaults to 0.95.
+            factor (float, optional): multiplier applied to the RTT percentile. Defaults to 3.0.
+            window (int, optional): number of RTT samples kept. Defaults to 50.
+        """
+        self.ip = ip
+        self.port = port
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.percentile = percentile
+        self.factor = factor
+        self.window = window
+        self.state = CLOSED
+        self.failures = 0
+        self.rtts = []
+        self.lock = threading.Lock()
+        self.probe_thread = None
+        self.trial = False
+
+    def get_name(self) -> str:
+        """Return name"""
+        return f"{self.ip}:{self.port}"
+
+    def timeout(self) -> float:
+        """Return the timeout to use for the next request, in seconds."""
+        with self.lock:
+            if not self.rtts:
+                return self.default_timeout
+            rtts = sorted(self.rtts)
+        rtt = rtts[min(len(rtts) - 1, int(len(rtts) * self.percentile))]
+        return max(self.min_timeout, min(self.max_timeout, rtt * self.factor))
+
+    def check(self) -> None:
+        """Raise CircuitOpenError if requests to the device must fail fast.
+
+        While half-open, only the first request is let through as a trial.
+        """
+        with self.lock:
+            if self.state == OPEN:
+                raise CircuitOpenError(f"Circuit open for {self.get_name()}, skipping request")
+            if self.state == HALF_OPEN:
+                if self.trial:
+                    raise CircuitOpenError(f"Circuit half-open for {self.get_name()}, trial request in progress")
+                self.trial = True
+
+    def record_success(self, rtt: float = None) -> None:
+        """Record a successful request and its round trip time.
+
+        Args:
+            rtt (float, optional): round trip time in seconds, None if the request got no reply. Defaults to None.
+        """
+        with self.lock:
+            if rtt is not None:
+                self.rtts.append(rtt)
+                del self.rtts[:-self.window]
+            self.failures = 0
+            self.trial = False
+            if self.state != CLOSED:
+                logger.info(f"Circuit closed for {self.get_name()}")
+            self.state = CLOSED
+
+    def record_failure(self) -> None:
+        """Record a failed request, opening the circuit if the threshold is reached."""
+        with self.lock:
+            self.failures += 1
+            self.trial = False
+            if self.state == CLOSED and self.failures < self.failure_threshold:
+                return
+            if self.state != OPEN:
+                logger.warning(f"Circuit opened for {self.get_name()} after {self.failures} failures")
+            self.state = OPEN
+            if self.probe_thread is None:
+                self.probe_thread = threading.Thread(target=self.__probe, daemon=True)
+                self.probe_thread.start()
+
+    def call(self, func, *args, timed: bool = True, **kwargs):
+        """Run func(*args, **kwargs) through the breaker, recording the outcome.
+
+        If timed is False the duration is not used as an RTT sample, e.g. for writes
+        that return before the device has answered.
+        """
+        self.check()
+        start = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(time.monotonic() - start if timed else None)
+        return result
+
+    def __probe(self) -> None:
+        """Probe the device in the background until it accepts a TCP connection.
+
+        The thread clears probe_thread under the lock when it stops, so a failure
+        recorded after that always starts a new probe.
+        """
+        while True:
+            time.sleep(self.probe_interval)
+            with self.lock:
+                if self.state != OPEN:
+                    self.probe_thread = None
+                    return
+            try:
+                with socket.create_connection((self.ip, self.port), timeout=self.max_timeout):
+                    pass
+            except OSError:
+                logger.debug(f"Probe of {self.get_name()} failed")
+                continue
+            with self.lock:
+                if self.state == OPEN:
+                    logger.info(f"Circuit half-open for {self.get_name()}")
+                    self.state = HALF_OPEN
+                    self.trial = False
+                self.probe_thread = None
+                return
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(ip: str, port: int, default_timeout: float, **kwargs) -> CircuitBreaker:
+    """Return the breaker of the device at ip:port, creating it on first use.
+
+    Breakers are shared by every driver instance talking to the same device, so
+    the RTT history and circuit state survive between sweeps.
+    """
+    with _breakers_lock:
+        if (ip, port) not in _breakers:
+            _breakers[(ip, port)] = CircuitBreaker(ip, port, default_timeout, **kwargs)
+        return _breakers[(ip, port)]
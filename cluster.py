@@ -0,0 +1,235 @@
+"""Coordination of several power_app nodes through a shared directory"""
+
+import bisect
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to nodes"""
+
+    def __init__(self, nodes: list, replicas: int = 64) -> None:
+        """Initialize a new instance of the class
+
+        Args:
+            nodes (list): node ids placed on the ring.
+            replicas (int, optional): virtual points per node. Defaults to 64.
+        """
+        self.ring = sorted((self.__hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas))
+        self.points = [point for point, _ in self.ring]
+
+    @staticmethod
+    def __hash(key: str) -> int:
+        return int(hashlib.md5(key.encode()).hexdigest(), 16)
+
+    def get_node(self, key: str) -> str:
+        """Return the node owning key, or None if the ring is empty."""
+        if not self.ring:
+            return None
+        i = bisect.bisect(self.points, self.__hash(key)) % len(self.ring)
+        return self.ring[i][1]
+
+
+class Node:
+    """Member of a cluster of power_app instances sharing cluster_dir.
+
+    Layout of cluster_dir:
+        nodes/<node_id>   heartbeat of each node (JSON, rewritten by a background thread)
+        leader.lock       flock held by the leader for as long as it runs
+        sweep.json        last sweep triggered, whose action every node applies to its shard,
+                          and the last action of the schedule
+
+    Each heartbeat increments a counter, and a node is alive while the others have
+    seen its counter change within heartbeat_timeout, measured on their own monotonic
+    clock so that clock skew between hosts does not matter. The heartbeat thread
+    stops beating, and releases the leader lock, when the main loop has not called
+    tick() for stall_timeout, so a hung node is treated as dead.
+
+    Devices are split between alive nodes by consistent hashing on their IP, so when
+    a node dies only its devices move to the others, which apply the action of the
+    last sweep to them. The leader lock is released by the kernel when the leader
+    exits, and the next node to poll takes it over.
+    """
+
+    def __init__(self, cluster_dir: str, node_id: str, heartbeat_timeout: float = 30.0, heartbeat_interval: float = 1.0,
+                 stall_timeout: float = 120.0) -> None:
+        """Initialize a new instance of the class
+
+        Args:
+            cluster_dir (str): directory shared by all nodes.
+            node_id (str): unique id of this node.
+            heartbeat_timeout (float, optional): seconds after which a silent node is considered dead. Defaults to 30.0.
+            heartbeat_interval (float, optional): seconds between two heartbeats. Defaults to 1.0.
+            stall_timeout (float, optional): seconds without tick() after which the node stops beating. Defaults to 120.0.
+        """
+        self.cluster_dir = cluster_dir
+        self.node_id = node_id
+        self.heartbeat_timeout = heartbeat_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.stall_timeout = stall_timeout
+        self.nodes_dir = os.path.join(cluster_dir, "nodes")
+        self.sweep_path = os.path.join(cluster_dir, "sweep.json")
+        self.leader = False
+        self.leader_lock = threading.Lock()
+        self.sweep_id = None
+        self.action = None
+        self.schedule = None
+        self.owned = set()
+        self.boot = uuid.uuid4().hex
+        self.beats = 0
+        self.seen = {}
+        self.progress = time.monotonic()
+
+        if not os.path.exists(self.nodes_dir):
+            os.makedirs(self.nodes_dir)
+
+        self.lock_file = open(os.path.join(cluster_dir, "leader.lock"), "a")
+
+    @staticmethod
+    def __read_json(path: str) -> dict:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def __write_json(path: str, data: dict) -> None:
+        """Write data atomically, so readers never see a partial file."""
+        # Every node runs as PID 1 in its own container, so the pid is not unique here
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def heartbeat(self) -> None:
+        """Record that this node is alive"""
+        self.beats += 1
+        self.__write_json(os.path.join(self.nodes_dir, self.node_id), {"node": self.node_id, "boot": self.boot, "beat": self.beats})
+
+    def tick(self) -> None:
+        """Record that the main loop is making progress"""
+        self.progress = time.monotonic()
+
+    def start(self) -> None:
+        """Start writing heartbeats in the background.
+
+        Heartbeats do not depend on the main loop, so a node stays alive for the
+        others while it is busy switching its shard.
+        """
+        self.heartbeat()
+        threading.Thread(target=self.__heartbeat_loop, daemon=True).start()
+
+    def __heartbeat_loop(self) -> None:
+        stalled = False
+        while True:
+            time.sleep(self.heartbeat_interval)
+            if time.monotonic() - self.progress > self.stall_timeout:
+                if not stalled:
+                    logger.error(f"Main loop of {self.node_id} stalled for more than {self.stall_timeout} s, not beating")
+                    self.__release_leader()
+                    stalled = True
+                continue
+            stalled = False
+            try:
+                self.heartbeat()
+            except OSError as e:
+                logger.error(f"Exception '{e}' while writing heartbeat of {self.node_id}")
+
+    def members(self) -> list:
+        """Return the ids of the alive nodes"""
+        now = time.monotonic()
+        members = []
+        for node_id in os.listdir(self.nodes_dir):
+            if node_id.endswith(".tmp"):
+                continue
+            beat = self.__read_json(os.path.join(self.nodes_dir, node_id))
+            counter = (beat.get("boot"), beat.get("beat"))
+            if node_id not in self.seen or self.seen[node_id][0] != counter:
+                self.seen[node_id] = (counter, now)
+            if now - self.seen[node_id][1] < self.heartbeat_timeout:
+                members.append(node_id)
+        return sorted(members)
+
+    def is_leader(self) -> bool:
+        """Return True if this node holds the leader lock, trying to take it if not."""
+        with self.leader_lock:
+            if not self.leader:
+                try:
+                    fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return False
+                logger.info(f"Node {self.node_id} is now the leader")
+                self.leader = True
+            return True
+
+    def __release_leader(self) -> None:
+        with self.leader_lock:
+            if self.leader:
+                fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+                logger.warning(f"Node {self.node_id} released the leader lock")
+                self.leader = False
+
+    def shard(self, devices: list) -> list:
+        """Return the devices owned by this node among the alive nodes.
+
+        Args:
+            devices (list): inventory entries, each with an "ip" key.
+        """
+        members = self.members()
+        if self.node_id not in members:
+            members.append(self.node_id)
+        ring = HashRing(members)
+        return [device for device in devices if ring.get_node(device["ip"]) == self.node_id]
+
+    def trigger(self, action: str, scheduled: bool = False) -> None:
+        """Publish a sweep to be executed by every node on its shard.
+
+        Only scheduled sweeps change the schedule state; manual ones carry it over.
+
+        Args:
+            action (str): "on" or "off".
+            scheduled (bool, optional): True if the sweep comes from the schedule. Defaults to False.
+        """
+        logger.info(f"Node {self.node_id} triggering sweep '{action}'")
+        schedule = action if scheduled else self.__read_json(self.sweep_path).get("schedule")
+        self.__write_json(self.sweep_path, {"id": uuid.uuid4().hex, "action": action, "schedule": schedule,
+                                            "node": self.node_id, "time": time.time()})
+
+    def poll_sweep(self, devices: list) -> tuple:
+        """Return the action of the last sweep and the devices this node still has to switch.
+
+        Also updates schedule from the last scheduled action.
+
+        The shard is recomputed on every poll: on a new sweep the whole shard is
+        returned, otherwise only the devices assigned to this node since the last
+        poll, e.g. those of a node that died. A node that starts applies the last
+        sweep to its shard, so sweeps in progress are not missed.
+
+        Args:
+            devices (list): inventory entries, each with an "ip" key.
+
+        Returns:
+            tuple: action ("on", "off" or None if no sweep was triggered yet), list of devices.
+        """
+        sweep = self.__read_json(self.sweep_path)
+        if sweep.get("id") is None:
+            return None, []
+        self.schedule = sweep.get("schedule")
+        if sweep["id"] != self.sweep_id:
+            self.sweep_id = sweep["id"]
+            self.action = sweep["action"]
+            self.owned = set()
+
+        shard = self.shard(devices)
+        pending = [device for device in shard if device["ip"] not in self.owned]
+        self.owned = {device["ip"] for device in shard}
+        return self.action, pending
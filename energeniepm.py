@@ -1,13 +1,16 @@
 """Class of the EGPM2"""
 
-import argparse
 import re
 import subprocess
 import logging
-from bs4 import BeautifulSoup
+
+from circuitbreaker import CircuitOpenError, get_breaker
 
 logger = logging.getLogger(__name__)
 
+# wget exit status for network failures (DNS, refused connection, timeout)
+WGET_NETWORK_FAILURE = 4
+
 class EGPM2:
     """Class of the EGPM2"""
 
@@ -25,6 +28,7 @@ class EGPM2:
         self.password = password
         self.ch_state = []
         self.mac = ""
+        self.breaker = get_breaker(ip, port, default_timeout=10.0, max_timeout=10.0)
         if connect:
             self.connect()
 
@@ -38,8 +42,18 @@ class EGPM2:
         Returns:
             int: if stdout is true, returns the output of the command
         """
-        sp = subprocess.run(cmd.split(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-        return sp.stdout
+        timeout = self.breaker.timeout()
+        args = cmd.split() + [f"--timeout={timeout:.1f}", "--tries=1"]
+
+        def run():
+            # wget applies the timeout to DNS, connect and read separately
+            sp = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+                                timeout=3 * timeout)
+            if sp.returncode == WGET_NETWORK_FAILURE:
+                raise Exception(f"Network failure running '{cmd}'")
+            return sp
+
+        return self.breaker.call(run).stdout
 
     def connect(self) -> None:
         """Connect"""
@@ -84,11 +98,15 @@ class EGPM2:
             else:
                 logging.error("Error, mac not found in: \n" + output)
 
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logging.error(f"Exception '{e}' while collecting info")
 
     def get_output_state(self, socket_id: int) -> str:
         """Return output state"""
+        from bs4 import BeautifulSoup
+
         try:
             cmd = f"wget http://{self.ip}:{self.port}/ -O -"
             html = self.__run_command(cmd)
@@ -138,7 +156,9 @@ class EGPM2:
         self.set_output_state(channel, True)
         self.__get_data()
 
-        if self.ch_state[channel - 1] == "1":
+        if len(self.ch_state) < channel:
+            logging.error(f"Error reading state of channel {channel}")
+        elif self.ch_state[channel - 1] == "1":
             logging.info(f"Turned on channel {channel}")
         else:
             logging.error(f"Error turning on channel {channel}")
@@ -155,7 +175,9 @@ class EGPM2:
         self.set_output_state(channel, False)
         self.__get_data()
 
-        if self.ch_state[channel - 1] == "0":
+        if len(self.ch_state) < channel:
+            logging.error(f"Error reading state of channel {channel}")
+        elif self.ch_state[channel - 1] == "0":
             logging.info(f"Turned off channel {channel}")
         else:
             logging.error(f"Error turning off channel {channel}")
@@ -163,6 +185,8 @@ class EGPM2:
 
 def main() -> int:
     """Main entry point"""
+    import argparse
+
     # usage: EGPM2_HTTP.py [-h] [-p PORT] ip [{ON,OFF}] [channel]
 
     parser = argparse.ArgumentParser(description="Control Energenie EGPM2 power strip over HTTP")
@@ -1,54 +1,100 @@
 # main.py
-import mx180tp
-import webline
-import energeniepm
+# The drivers pull in requests and bs4, so they are imported inside switch_device:
+# the process reaches the signal handlers without loading them.
 import datetime
 import logging
 import logging.config
 import os
 import signal
-
-def power_off():
-    try :
-        logging.info("Powering off ...")
-        wl = webline.WEBLINE("10.152.4.143", "admin", "admin", 0)
-        eg = energeniepm.EGPM2("10.152.4.191")
-        wl.turn_off()
-        eg.turn_off_channel(3)
-
-        mx_154 = mx180tp.MX180TP("10.152.4.154", 9221)
-        mx_154.turn_off_channel(1)
-        mx_157 = mx180tp.MX180TP("10.152.4.157", 9221)
-        mx_157.turn_off_channel(1)
-        mx_157.turn_off_channel(2)
-    except Exception as e:
-        logging.error(f"Exception '{e}' while powering off")
-
-def power_on():
-    try:
-        logging.info("Powering on ...")
-        wl = webline.WEBLINE("10.152.4.143", "admin", "admin", 0)
-        eg = energeniepm.EGPM2("10.152.4.191")
-        wl.turn_on()
-        eg.turn_on_channel(3)
-
-        mx_154 = mx180tp.MX180TP("10.152.4.154", 9221)
-        mx_154.turn_on_channel(1)
-        mx_157 = mx180tp.MX180TP("10.152.4.157", 9221)
-        mx_157.turn_on_channel(1)
-        mx_157.turn_on_channel(2)
-    except Exception as e:
-        logging.error(f"Exception '{e}' while powering on")
+import time
+
+# Devices switched by this instance, overridden by the JSON list at $POWER_APP_INVENTORY
+inventory = [
+    {"type": "webline", "ip": "10.152.4.143", "user": "admin", "password": "admin", "port": 0},
+    {"type": "egpm2", "ip": "10.152.4.191", "channels": [3]},
+    {"type": "mx180tp", "ip": "10.152.4.154", "port": 9221, "channels": [1]},
+    {"type": "mx180tp", "ip": "10.152.4.157", "port": 9221, "channels": [1, 2]},
+]
+
+# Cluster membership, set by main() when $POWER_APP_CLUSTER_DIR is defined
+node = None
+
+# Seconds between two iterations of the main loop
+POLL_INTERVAL = 1.0
+
+def load_inventory(path):
+    import json
+
+    with open(path) as f:
+        return json.load(f)
+
+def switch_device(device, state):
+    import mx180tp
+    import webline
+    import energeniepm
+
+    if device["type"] == "webline":
+        wl = webline.WEBLINE(device["ip"], device.get("user", "admin"), device.get("password", "admin"), device.get("port", 0))
+        if state:
+            wl.turn_on()
+        else:
+            wl.turn_off()
+    elif device["type"] == "egpm2":
+        eg = energeniepm.EGPM2(device["ip"], device.get("port", 80))
+        for channel in device["channels"]:
+            if state:
+                eg.turn_on_channel(channel)
+            else:
+                eg.turn_off_channel(channel)
+    elif device["type"] == "mx180tp":
+        mx = mx180tp.MX180TP(device["ip"], device.get("port", 9221))
+        for channel in device["channels"]:
+            if state:
+                mx.turn_on_channel(channel)
+            else:
+                mx.turn_off_channel(channel)
+    else:
+        logging.error(f"Device type {device['type']} not supported")
+
+def power_off(devices=None):
+    logging.info("Powering off ...")
+    for device in inventory if devices is None else devices:
+        if node is not None:
+            node.tick()
+        try:
+            switch_device(device, False)
+        except Exception as e:
+            logging.error(f"Exception '{e}' while powering off {device['ip']}")
+
+def power_on(devices=None):
+    logging.info("Powering on ...")
+    for device in inventory if devices is None else devices:
+        if node is not None:
+            node.tick()
+        try:
+            switch_device(device, True)
+        except Exception as e:
+            logging.error(f"Exception '{e}' while powering on {device['ip']}")
+
+def sweep(action, scheduled=False):
+    # In cluster mode every node switches its own shard when it sees the sweep
+    if node is not None:
+        node.trigger(action, scheduled)
+    elif action == "off":
+        power_off()
+    else:
+        power_on()
 
 def signal_handler(sig, frame):
     if sig == signal.SIGUSR1:
         logging.warning(f"Detected signal {signal.SIGUSR1}")
-        power_off()
+        sweep("off")
     if sig == signal.SIGUSR2:
         logging.warning(f"Detected signal {signal.SIGUSR2}")
-        power_on()
+        sweep("on")
 
 def main():
+    global inventory, node
 
     flag = True
 
@@ -97,6 +143,17 @@ def main():
     logger = logging.getLogger(__name__)
     logger.info("Logging is configured and ready.")
 
+    if os.environ.get("POWER_APP_INVENTORY"):
+        inventory = load_inventory(os.environ["POWER_APP_INVENTORY"])
+
+    if os.environ.get("POWER_APP_CLUSTER_DIR"):
+        import cluster
+        import socket
+
+        node = cluster.Node(os.environ["POWER_APP_CLUSTER_DIR"], os.environ.get("POWER_APP_NODE_ID", socket.gethostname()))
+        node.start()
+        logger.info(f"Running as cluster node {node.node_id}")
+
     days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
     logging.info("Starting process ...")
@@ -106,13 +163,29 @@ def main():
         current_hour = now.hour
         current_minute = now.minute
 
-        if (((current_hour == 18 and current_minute == 0) or (days[now.weekday()] in ["Saturday", "Sunday"])) and flag == True):
-            power_off()
-            flag = False
-
-        if current_hour == 8 and current_minute == 0 and days[now.weekday()] in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"] and flag == False:
-            power_on()
-            flag = True
+        if node is not None:
+            node.tick()
+            action, devices = node.poll_sweep(inventory)
+            # The schedule state is shared, so a new leader resumes where the last one
+            # stopped; manual sweeps from signals leave it unchanged, as in standalone mode
+            if node.schedule is not None:
+                flag = node.schedule == "on"
+            if devices and action == "off":
+                power_off(devices)
+            elif devices and action == "on":
+                power_on(devices)
+
+        # Only the leader follows the schedule in cluster mode
+        if node is None or node.is_leader():
+            if (((current_hour == 18 and current_minute == 0) or (days[now.weekday()] in ["Saturday", "Sunday"])) and flag == True):
+                sweep("off", scheduled=True)
+                flag = False
+
+            if current_hour == 8 and current_minute == 0 and days[now.weekday()] in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"] and flag == False:
+                sweep("on", scheduled=True)
+                flag = True
+
+        time.sleep(POLL_INTERVAL)
 
 
 if __name__ == "__main__":
@@ -1,10 +1,11 @@
 """Manage MX180TP"""
 
 import logging
-import argparse
 import socket
 import time
 
+from circuitbreaker import CircuitOpenError, get_breaker
+
 logger = logging.getLogger(__name__)
 
 class MX180TP:
@@ -20,8 +21,9 @@ class MX180TP:
         """
         self.ip = ip
         self.port = port
+        self.breaker = get_breaker(ip, port, default_timeout=3.0, max_timeout=3.0)
         self.s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.s.settimeout(3.0)
+        self.s.settimeout(self.breaker.timeout())
 
         if connect:
             self.connect()
@@ -29,22 +31,42 @@ class MX180TP:
     def connect(self) -> None:
         """Connect"""
         try:
-            self.s.connect((self.ip, self.port))
+            self.breaker.call(self.s.connect, (self.ip, self.port))
         except Exception as e:
             logging.error(f"Exception '{e}' while connecting to{self.ip}:{self.port}")
             raise Exception(f"Exception '{e}' while connecting to{self.ip}:{self.port}")
 
-    def __send_req(self, cmd: str) -> str:
+    def __exchange(self, cmd: str) -> str:
         self.s.send(cmd.encode())
         try:
-            data = self.s.recv(1024).decode()
+            return self.s.recv(1024).decode()
+        except socket.timeout:
+            # A late reply would be read as the answer to the next query
+            self.__reconnect()
+            raise
+
+    def __reconnect(self) -> None:
+        self.s.close()
+        self.s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.s.settimeout(self.breaker.timeout())
+        try:
+            self.s.connect((self.ip, self.port))
+        except OSError as e:
+            logging.error(f"Exception '{e}' while reconnecting to {self.ip}:{self.port}")
+
+    def __send_req(self, cmd: str) -> str:
+        self.s.settimeout(self.breaker.timeout())
+        try:
+            data = self.breaker.call(self.__exchange, cmd)
+        except CircuitOpenError:
+            raise
         except Exception:
             logging.error("Error: no data recv")
             return "Error: no data recv"
         return data.strip()
 
     def __send_cmd(self, cmd: str) -> None:
-        self.s.send(cmd.encode())
+        self.breaker.call(self.s.send, cmd.encode(), timed=False)
         time.sleep(1)
 
     def get_ip(self) -> str:
@@ -247,6 +269,8 @@ class MX180TP:
 
 def main() -> int:
     """Main entry point"""
+    import argparse
+
     # usage: mx180tp.py [-h] [-p PORT] ip [{status,ON,OFF}] [channel] [value]
 
     parser = argparse.ArgumentParser(description="Control TTi MX180TP over TCP")
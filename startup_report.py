@@ -0,0 +1,92 @@
+"""Measure the time the app takes to be ready to handle signals"""
+
+import argparse
+import os
+import select
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+# Logged by main() once the signal handlers are installed and logging is configured
+READY_LINE = "Logging is configured and ready."
+
+
+def start_until_ready(cmd: list, timeout: float) -> tuple:
+    """Start cmd, wait for the ready line on its stderr, then stop it.
+
+    Args:
+        cmd (list): command to be run.
+        timeout (float): seconds to wait for the ready line.
+
+    Returns:
+        tuple: seconds until the ready line (None on timeout), stderr lines read until then.
+    """
+    start = time.monotonic()
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    lines = []
+    elapsed = None
+    try:
+        while time.monotonic() - start < timeout:
+            ready, _, _ = select.select([proc.stderr], [], [], timeout)
+            if not ready:
+                break
+            line = proc.stderr.readline()
+            if not line:
+                break
+            lines.append(line.rstrip("\n"))
+            if READY_LINE in line:
+                elapsed = time.monotonic() - start
+                break
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+    return elapsed, lines
+
+
+def main() -> int:
+    """Main entry point"""
+    # usage: startup_report.py [-h] [-n RUNS] [-l LIMIT] [-s SCRIPT] [-o OUTPUT] binary
+
+    parser = argparse.ArgumentParser(description="Time the start of the power_app binary up to its ready log line")
+    parser.add_argument("binary", help="Path of the binary")
+    parser.add_argument("-n", "--runs", action="store", dest="runs", type=int, help="Number of starts", default=5)
+    parser.add_argument("-l", "--limit", action="store", dest="limit", type=float, help="Limit of the median start time, in ms", default=200.0)
+    parser.add_argument("-s", "--script", action="store", dest="script", help="main.py to profile imports of the same startup with -X importtime", default=None)
+    parser.add_argument("-o", "--output", action="store", dest="output", help="Report file", default=None)
+
+    args = parser.parse_args()
+
+    report = []
+    times = []
+    for i in range(1, args.runs + 1):
+        elapsed, lines = start_until_ready([args.binary], timeout=30.0)
+        if elapsed is None:
+            report.append(f"Run {i}: not ready after 30 s, output:")
+            report.extend(lines)
+            continue
+        times.append(elapsed * 1000)
+        report.append(f"Run {i}: ready in {elapsed * 1000:.1f} ms")
+
+    ok = len(times) == args.runs and statistics.median(times) <= args.limit
+    if times:
+        report.append(f"Median: {statistics.median(times):.1f} ms, limit: {args.limit:.0f} ms, {'OK' if ok else 'FAILED'}")
+
+    if args.script is not None:
+        _, lines = start_until_ready([sys.executable, "-X", "importtime", args.script], timeout=30.0)
+        report.append("")
+        report.append(f"Imports until ready ({args.script}):")
+        report.extend(line for line in lines if line.startswith("import time:"))
+
+    text = "\n".join(report) + "\n"
+    print(text, end="")
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,9 +11,8 @@
 
 
 import logging
-import requests
-from requests.auth import HTTPDigestAuth
-import argparse
+
+from circuitbreaker import get_breaker
 
 logger = logging.getLogger(__name__)
 
@@ -36,38 +35,44 @@ class WEBLINE:
         self.password = password
         self.ip = ip
         self.port = port
+        self.breaker = get_breaker(ip, 80, default_timeout=10.0, max_timeout=10.0)
+
+    def __get(self, url: str):
+        """Send an authenticated GET request through the device circuit breaker."""
+        import requests
+        from requests.auth import HTTPDigestAuth
+
+        return self.breaker.call(requests.get, url, auth=HTTPDigestAuth(self.user, self.password),
+                                 timeout=self.breaker.timeout())
 
     def turn_off(self):
         logging.basicConfig(level=logging.INFO)
         url = f'http://{self.ip}/cgi/relaySt?Rel={self.port}'
-        r = requests.get(url, auth=HTTPDigestAuth(self.user, self.password),
-                        timeout=10)
+        r = self.__get(url)
 
         if(r.text == 'on'):
             logging.info("Turning off Webline ...")
             url = f'http://{self.ip}/cgi/toggleRelay?Rel={self.port}'
-            r = requests.get(url, auth=HTTPDigestAuth(self.user, self.password),
-                                timeout=10)
+            r = self.__get(url)
         elif(r.text == 'off'):
             logging.error("Webline is already off")
 
     def turn_on(self):
         logging.basicConfig(level=logging.INFO)
         url = f'http://{self.ip}/cgi/relaySt?Rel={self.port}'
-        r = requests.get(url, auth=HTTPDigestAuth(self.user, self.password),
-                        timeout=10)
+        r = self.__get(url)
 
         if(r.text == 'off'):
             logging.info("Turning on Webline ...")
             url = f'http://{self.ip}/cgi/toggleRelay?Rel={self.port}'
-            r = requests.get(url, auth=HTTPDigestAuth(self.user, self.password),
-                                timeout=10)
+            r = self.__get(url)
         elif(r.text == 'on'):
             logging.error("Webline is already on")
 
 
 def main() -> int:
     """Main entry point"""
+    import argparse
 
     parser = argparse.ArgumentParser(description="Control Brennenstuhl Premium-Web-Line V3 over TCP")
     parser.add_argument("ip", help="IP address")